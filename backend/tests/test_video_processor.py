@@ -0,0 +1,322 @@
+import logging
+import multiprocessing
+import time
+
+import cv2
+import numpy as np
+import orjson
+import pytest
+
+import video_processor as vp
+
+
+@pytest.fixture
+def fake_roboflow(monkeypatch):
+    def _infer(frame, *args, scale_x=1.0, scale_y=1.0, **kwargs):
+        time.sleep(0.001)
+        return {"predictions": [{"x": 10, "y": 10, "width": 4, "height": 4,
+                                 "confidence": 0.9, "class": "Basketball"}]}, scale_x, scale_y
+
+    monkeypatch.setattr(vp, "_infer_frame_api", _infer)
+
+
+def test_dedup_yields_every_sampled_frame_once_in_order(monkeypatch, fake_roboflow):
+    # Decoding slower than inference shrinks the in-flight window to one request, so a duplicate's
+    # reference frame has usually been collected already by the time the duplicate is sampled.
+    frame_skip = 3
+    samples = 300
+    frame = np.zeros((32, 32, 3), np.uint8)
+
+    def _frames(video_path, cap, fps, frame_skip, infer_max_width, need_pixels=False):
+        for i in range(samples):
+            time.sleep(0.004)
+            yield i * frame_skip, i * frame_skip / 30.0, frame, 1.0, 1.0
+
+    monkeypatch.setattr(vp, "_iter_sampled_frames", _frames)
+    monkeypatch.setenv("ROBOFLOW_MOTION_THRESHOLD", "5")
+    monkeypatch.setenv("ROBOFLOW_MOTION_MAX_GAP", "2")
+    stats = {}
+    detections = list(vp._iter_ball_detections(None, None, 30.0, frame_skip, "key", 0.25,
+                                               1, 0, stats))
+
+    assert [d["frame"] for d in detections] == list(range(0, samples * frame_skip, frame_skip))
+    assert stats["skippedFrames"] > 0
+    assert all(d["boxes"] for d in detections)
+
+
+def _write_video(path, cuts, total_frames, size=(64, 48), fps=30.0):
+    # Solid-colour segments alternating black / saturated red, so every cut scores far above 70.
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV has no MJPG writer")
+    edges = [0] + list(cuts) + [total_frames]
+    for i in range(len(edges) - 1):
+        frame = np.zeros((size[1], size[0], 3), np.uint8)
+        if i % 2:
+            frame[:, :] = (0, 0, 255)
+        for _ in range(edges[i + 1] - edges[i]):
+            writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def test_parallel_scene_detection_keeps_cut_just_after_chunk_boundary(tmp_path, monkeypatch):
+    monkeypatch.delenv("SCENE_DETECTOR", raising=False)
+    # Two chunks split at frame 60; the cut is closer to the boundary than min_scene_len.
+    path = _write_video(tmp_path / "boundary.avi", [62], 120)
+
+    assert vp._detect_scene_cuts(path, 0, 120, 70.0, 15) == [62]
+    scenes = vp._detect_scenes_parallel(path, 120, 30.0, 2, 70.0, 15)
+    assert [round(scene["start"] * 30) for scene in scenes] == [0, 62]
+
+
+def test_opencv_scene_detector_matches_content_detector(tmp_path):
+    # Includes cuts closer than min_scene_len, which PySceneDetect's MERGE filter folds together.
+    path = _write_video(tmp_path / "cuts.avi", [100, 105, 200, 208, 214, 400, 410, 500], 600)
+
+    expected = vp._detect_scene_cuts(path, 0, 600, 70.0, 15)
+    assert vp._detect_scene_cuts_cv2(path, 0, 600, 70.0, 15) == expected
+    assert vp._detect_scene_cuts_cv2(path, 150, 600, 70.0, 15) == vp._detect_scene_cuts(path, 150, 600, 70.0, 15)
+
+
+def _write_textured_video(path, total_frames, size=(640, 360), fps=30.0, seed=0):
+    # Blocky noise nudged by a random amount on about half the frames: scores spread across the
+    # whole range, so many land close enough to a threshold that the downscale filter matters.
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV has no MJPG writer")
+    rng = np.random.default_rng(seed)
+    texture = rng.integers(0, 256, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+    for _ in range(total_frames):
+        if rng.random() < 0.5:
+            step = rng.integers(-1, 2, texture.shape) * int(rng.integers(1, 80))
+            texture = np.clip(texture.astype(int) + step, 0, 255).astype(np.uint8)
+        writer.write(cv2.resize(texture, size, interpolation=cv2.INTER_NEAREST))
+    writer.release()
+    return str(path)
+
+
+@pytest.mark.parametrize("min_scene_len", [1, 4])
+def test_opencv_scene_detector_matches_content_detector_on_textured_frames(tmp_path, min_scene_len):
+    # 640 wide is downscaled by a non-integer factor (2.5), where size and interpolation both
+    # change the scores.
+    path = _write_textured_video(tmp_path / "textured.avi", 120)
+
+    for threshold in (8.0, 15.0, 30.0):
+        expected = vp._detect_scene_cuts(path, 0, 120, threshold, min_scene_len)
+        assert vp._detect_scene_cuts_cv2(path, 0, 120, threshold, min_scene_len) == expected
+
+
+def test_background_detection_skips_cache_when_frames_failed(tmp_path, monkeypatch):
+    monkeypatch.setattr(vp, "BALLS_CACHE_DIR", str(tmp_path))
+    results = {"failedFrames": 3}
+    monkeypatch.setattr(vp, "detect_balls", lambda *args, **kwargs: ([], dict(results)))
+
+    vp._detect_and_cache_balls(str(tmp_path / "missing.mp4"), "abc")
+    assert not (tmp_path / "abc.ndjson").exists()
+
+    results["failedFrames"] = 0
+    vp._detect_and_cache_balls(str(tmp_path / "missing.mp4"), "abc")
+    assert (tmp_path / "abc.ndjson").exists()
+
+
+@pytest.fixture
+def video_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(vp, "CACHE_DIR", str(tmp_path))
+    (tmp_path / "input.mp4").write_bytes(bytes(range(256)) * 4)
+    return vp.app.test_client()
+
+
+def test_video_range_requests(video_client):
+    body = bytes(range(256)) * 4
+
+    response = video_client.get("/video", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 10-19/1024"
+    assert response.data == body[10:20]
+
+    response = video_client.get("/video", headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.data == body[-4:]
+
+    response = video_client.get("/video", headers={"Range": "bytes=2048-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */1024"
+
+
+@pytest.mark.parametrize("range_header", ["bytes=0-1,5-6", "bytes=abc", "items=0-1", "bytes=-", "bytes=9-3"])
+def test_video_ignores_unusable_range_headers(video_client, range_header):
+    response = video_client.get("/video", headers={"Range": range_header})
+    assert response.status_code == 200
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.data == bytes(range(256)) * 4
+
+
+def _box(box_type, payload=b""):
+    return (8 + len(payload)).to_bytes(4, "big") + box_type + payload
+
+
+def _ftyp(major, *compatible):
+    return _box(b"ftyp", major + (0).to_bytes(4, "big") + b"".join(compatible))
+
+
+@pytest.mark.parametrize("data, expected", [
+    (_ftyp(b"isom", b"isom", b"iso2", b"avc1", b"mp41") + _box(b"moov", b"\0" * 16) + _box(b"mdat", b"\0" * 32), True),
+    (_ftyp(b"M4V ", b"M4V ", b"mp42") + _box(b"free", b"\0" * 4) + _box(b"moov") + _box(b"mdat"), True),
+    (_ftyp(b"isom", b"isom", b"mp41") + _box(b"mdat", b"\0" * 32) + _box(b"moov", b"\0" * 16), False),
+    (_ftyp(b"qt  ", b"qt  ") + _box(b"moov", b"\0" * 16) + _box(b"mdat", b"\0" * 32), False),
+    (_ftyp(b"qt  ", b"qt  ", b"isom") + _box(b"moov") + _box(b"mdat"), False),
+    (_ftyp(b"3gp4", b"3gp4") + _box(b"moov") + _box(b"mdat"), False),
+    (_box(b"moov") + _box(b"mdat"), False),
+    (_ftyp(b"isom", b"isom")[:12], False),
+    (_ftyp(b"isom", b"isom") + b"\0\0\0\x10mo", False),
+    (_ftyp(b"isom", b"isom") + _box(b"free", b"\0" * 64)[:20], False),
+    (b"", False),
+])
+def test_moov_before_mdat(tmp_path, data, expected):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(data)
+    assert vp._moov_before_mdat(str(path)) is expected
+
+
+def test_clear_cache_removes_detection_caches(tmp_path, monkeypatch):
+    scenes_dir, balls_dir = tmp_path / "scenes", tmp_path / "balls"
+    scenes_dir.mkdir()
+    balls_dir.mkdir()
+    monkeypatch.setattr(vp, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(vp, "SCENES_CACHE_DIR", str(scenes_dir))
+    monkeypatch.setattr(vp, "BALLS_CACHE_DIR", str(balls_dir))
+    (tmp_path / "input.mp4").write_bytes(b"video")
+    for path in (scenes_dir / "old.json", scenes_dir / "fp-1-opencv-0-0.json", balls_dir / "old.ndjson",
+                 balls_dir / "old.lock", balls_dir / "fp-1-3-0.25-960-0-0-10.ndjson",
+                 balls_dir / "busy.ndjson", balls_dir / "busy.mp4", balls_dir / "new.ndjson.1.2.tmp"):
+        path.write_bytes(b"")
+
+    lock = vp._lock_ball_cache("busy")
+    try:
+        response = vp.app.test_client().delete("/cache")
+    finally:
+        lock.close()
+
+    assert response.status_code == 200
+    assert sorted(p.name for p in scenes_dir.iterdir()) == []
+    assert sorted(p.name for p in balls_dir.iterdir()) == ["busy.lock", "busy.mp4", "busy.ndjson",
+                                                           "new.ndjson.1.2.tmp"]
+    assert not (tmp_path / "input.mp4").exists()
+
+
+DETECTIONS = [
+    {"time": 0.0, "frame": 0, "boxes": []},
+    {"time": 0.1, "frame": 3, "boxes": [{"x": 1, "y": 2, "w": 3, "h": 4, "confidence": 0.9, "class": "Basketball"}]},
+]
+
+
+def test_ball_cache_round_trips_as_ndjson(tmp_path):
+    path = tmp_path / "abc.ndjson"
+    vp._write_ball_cache(str(path), DETECTIONS)
+
+    assert path.read_bytes().count(b"\n") == len(DETECTIONS)
+    assert vp._load_cached_detections(str(path)) == DETECTIONS
+    assert list(vp._iter_cached_detection_lines(str(path))) == [orjson.dumps(d) for d in DETECTIONS]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_ball_cache_reads_legacy_json_array(tmp_path):
+    path = tmp_path / "legacy.json"
+    path.write_bytes(orjson.dumps(DETECTIONS, option=orjson.OPT_INDENT_2))
+
+    assert vp._load_cached_detections(str(path)) == DETECTIONS
+
+
+def test_ball_cache_drops_truncated_last_line(tmp_path):
+    path = tmp_path / "partial.ndjson"
+    complete = b"".join(orjson.dumps(d) + b"\n" for d in DETECTIONS)
+    path.write_bytes(b"\n" + complete + b'{"time": 0.2, "fra')
+
+    assert vp._load_cached_detections(str(path)) == DETECTIONS
+
+
+def test_write_atomic_keeps_previous_file_on_failure(tmp_path):
+    path = tmp_path / "abc.ndjson"
+    vp._write_ball_cache(str(path), DETECTIONS)
+
+    def _chunks():
+        yield b'{"time": 9.9}\n'
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        vp._write_atomic(str(path), _chunks())
+    assert vp._load_cached_detections(str(path)) == DETECTIONS
+    assert list(tmp_path.iterdir()) == [path]
+
+
+class _ChunkedStream:
+    def __init__(self, data, sizes):
+        self._data = data
+        self._sizes = iter(sizes)
+
+    def read(self, size=-1):
+        n = next(self._sizes, len(self._data))
+        chunk, self._data = self._data[:n], self._data[n:]
+        return chunk
+
+
+def _jpegs(count):
+    frames = []
+    for i in range(count):
+        image = np.full((16, 24, 3), i * 40, np.uint8)
+        image[::3, ::2] = 255 - i * 30
+        frames.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return frames
+
+
+def test_jpeg_stream_splits_concatenated_frames():
+    frames = _jpegs(5)
+    data = b"".join(frames)
+    # Cut right between 0xFF and 0xD9 of every EOI marker, and at a SOI marker.
+    eoi_splits, offset = [], 0
+    for frame in frames:
+        eoi_splits.append(offset + len(frame) - 1)
+        offset += len(frame)
+    cuts = sorted(set(eoi_splits + [len(frames[0]) + 1]))
+    sizes = [b - a for a, b in zip([0] + cuts, cuts)]
+
+    for chunk_sizes in (sizes, [1] * len(data), [7] * len(data), [len(data)]):
+        assert list(vp._iter_jpeg_stream(_ChunkedStream(data, chunk_sizes))) == frames
+
+
+def test_jpeg_stream_drops_trailing_partial_frame():
+    frames = _jpegs(2)
+    assert list(vp._iter_jpeg_stream(_ChunkedStream(frames[0] + frames[1][:-5], [3] * 1000))) == frames[:1]
+
+
+def _log_lines(path, worker, count, start):
+    start.wait()
+    handler = vp._SharedRotatingFileHandler(path, maxBytes=16384, backupCount=4)
+    log = logging.getLogger(f"shared-rotation-{worker}")
+    log.propagate = False
+    queue_handler = vp._ProcessQueueHandler(handler)
+    log.addHandler(queue_handler)
+    for i in range(count):
+        log.warning("worker %d line %d", worker, i)
+    queue_handler.close()
+
+
+def test_shared_log_file_keeps_every_line_across_processes(tmp_path):
+    # Several forked writers rolling the same small file over. Everything fits in the backups, so
+    # no line may be lost or duplicated.
+    path = str(tmp_path / "video-processor.log")
+    ctx = multiprocessing.get_context("fork")
+    start = ctx.Event()
+    workers = [ctx.Process(target=_log_lines, args=(path, worker, 250, start)) for worker in range(8)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    lines = [line for p in tmp_path.glob("video-processor.log*") if not p.name.endswith(".lock")
+             for line in p.read_text().splitlines()]
+    assert len(list(tmp_path.glob("video-processor.log.*"))) > 2
+    assert sorted(lines) == sorted(f"worker {w} line {i}" for w in range(8) for i in range(250))
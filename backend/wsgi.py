@@ -1,4 +1,6 @@
 from video_processor import app
 
+application = app
+
 if __name__ == "__main__":
     app.run()